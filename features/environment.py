@@ -3,7 +3,9 @@ Environment for Behave Testing
 """
 
 from os import getenv
+import requests
 from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
 
 WAIT_SECONDS = int(getenv("WAIT_SECONDS", "60"))
 BASE_URL = getenv("BASE_URL", "http://localhost:8080")
@@ -19,20 +21,36 @@ def before_all(context):
         context.driver = get_firefox()
     else:
         context.driver = get_chrome()
-    context.driver.implicitly_wait(context.wait_seconds)
+    # Steps use explicit WebDriverWaits only, so never stack an implicit wait on top
+    context.driver.implicitly_wait(0)
+    context.http = get_http_session()
     context.config.setup_logging()
 
 
+def before_scenario(context, scenario):
+    """Executed before each scenario"""
+    # One reusable waiter for every explicit wait in the steps
+    context.wait = WebDriverWait(context.driver, context.wait_seconds)
+
+
 def after_all(context):
     """Executed after all tests"""
+    context.http.close()
     context.driver.quit()
 
 
 ######################################################################
-# Utility functions to create web drivers
+# Utility functions to create web drivers and HTTP sessions
 ######################################################################
 
 
+def get_http_session():
+    """Creates a keep-alive HTTP session for calling the REST API"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
 def get_chrome():
     """Creates a headless Chrome driver"""
     options = webdriver.ChromeOptions()
@@ -2,10 +2,10 @@
 # Combined Behave step definitions for API setup and Selenium UI interactions
 
 import logging
-import requests
+from functools import lru_cache
 from behave import given, when, then
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select, WebDriverWait
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions
 
 # Constants
@@ -13,35 +13,83 @@ HTTP_200_OK = 200
 HTTP_201_CREATED = 201
 HTTP_204_NO_CONTENT = 204
 ID_PREFIX = ""
+# Type of each column in the "following recommendations" table
+FIELD_TYPES = {
+    "product_id": int,
+    "customer_id": int,
+    "product_name": str,
+    "recommendation_name": str,
+    "recommend_product_id": int,
+    "recommend_type": str,
+    "rec_success": int,
+}
+# The parts of the page that show what the service sent back
+MESSAGE_CONTAINERS = '//*[@id="search_results" or @id="flash_message"]'
+# Element id prefix used by the form fields of each tab
+TAB_ID_PREFIXES = {
+    "create": "",
+    "read": "read_",
+    "update": "update_",
+    "delete": "delete_",
+}
+
+
+@lru_cache(maxsize=256)
+def element_id_for(element_name):
+    """Converts a field name like "Product ID" to its element id"""
+    return element_name.lower().replace(" ", "_")
+
+
+@lru_cache(maxsize=256)
+def button_id_for(button):
+    """Converts a button name like "Search" to its element id"""
+    return button.lower().replace(" ", "-") + "-btn"
+
+
+def set_field(context, element, value):
+    """Sets a form field's value with one script call instead of typing each key"""
+    context.driver.execute_script(
+        "arguments[0].value = arguments[1];"
+        "arguments[0].dispatchEvent(new Event('input', {bubbles: true}));"
+        "arguments[0].dispatchEvent(new Event('change', {bubbles: true}));",
+        element,
+        value,
+    )
+
+
+def assert_text_absent(context, container_xpath, text):
+    """Asserts the visible text of the containers does not include the text"""
+    # The text is compared in Python, so quotes in it never reach the XPath.
+    # find_elements returns right away with implicit waits disabled, and one
+    # script call reads innerText of every container
+    containers = context.driver.find_elements(By.XPATH, container_xpath)
+    visible_texts = context.driver.execute_script(
+        "return arguments[0].map(element => element.innerText);", containers
+    )
+    assert not any(
+        text in visible for visible in visible_texts
+    ), f'Found "{text}" in {container_xpath}'
 
 
 @given("the following recommendations")
 def step_impl(context):
     """Delete all Recommendations and load new ones"""
     rest_endpoint = f"{context.base_url}/api/recommendations"
-    context.resp = requests.get(rest_endpoint)
-    assert context.resp.status_code == HTTP_200_OK
-    for recommendation in context.resp.json():
-        context.resp = requests.delete(f"{rest_endpoint}/{recommendation['id']}")
-        assert context.resp.status_code == HTTP_204_NO_CONTENT
-
-    for row in context.table:
-        payload = {
-            "product_id": int(row["product_id"]),
-            "customer_id": int(row["customer_id"]),
-            "product_name": row["product_name"],
-            "recommendation_name": row["recommendation_name"],
-            "recommend_product_id": int(row["recommend_product_id"]),
-            "recommend_type": row["recommend_type"],
-            "rec_success": int(row["rec_success"]),
-        }
-        context.resp = requests.post(rest_endpoint, json=payload)
-        assert context.resp.status_code == HTTP_201_CREATED
+    context.resp = context.http.delete(rest_endpoint)
+    assert context.resp.status_code == HTTP_204_NO_CONTENT
+
+    payloads = [
+        {field: cast(row[field]) for field, cast in FIELD_TYPES.items()}
+        for row in context.table
+    ]
+    context.resp = context.http.post(f"{rest_endpoint}/bulk", json=payloads)
+    assert context.resp.status_code == HTTP_201_CREATED
 
 
 @when('I visit the "Home Page"')
 def step_impl(context):
     context.driver.get(context.base_url)
+    context.active_tab = None
 
 
 @then('I should see "{message}" in the title')
@@ -51,39 +99,39 @@ def step_impl(context, message):
 
 @then('I should not see "{text_string}"')
 def step_impl(context, text_string):
-    element = context.driver.find_element(By.TAG_NAME, "body")
-    assert text_string not in element.text
+    # Only the results table and the flash message show server output
+    assert_text_absent(context, MESSAGE_CONTAINERS, text_string)
 
 
 @when('I set the "{element_name}" to "{text_string}"')
 def step_impl(context, element_name, text_string):
-    element_id = element_name.lower().replace(" ", "_")
-    element = context.driver.find_element(By.ID, element_id)
-    element.clear()
-    element.send_keys(text_string)
+    element_id = element_id_for(element_name)
+    element = context.wait.until(
+        expected_conditions.presence_of_element_located((By.ID, element_id))
+    )
+    set_field(context, element, text_string)
 
 
 @when('I select "{text}" in the "{element_name}" dropdown')
 def step_impl(context, text, element_name):
-    base_id = element_name.lower().replace(" ", "_")
-    # Determine active tab
-    active_tab = context.driver.find_element(
-        By.CSS_SELECTOR, ".tab-pane.active"
-    ).get_attribute("id")
+    base_id = element_id_for(element_name)
+    # Determine active tab, only asking the browser if no tab switch was recorded
+    active_tab = getattr(context, "active_tab", None)
+    if active_tab is None:
+        active_tab = context.wait.until(
+            expected_conditions.presence_of_element_located(
+                (By.CSS_SELECTOR, ".tab-pane.active")
+            )
+        ).get_attribute("id")
+        context.active_tab = active_tab
 
     # Prefix based on tab
-    if "read" in active_tab:
-        element_id = f"read_{base_id}"
-    elif "update" in active_tab:
-        element_id = f"update_{base_id}"
-    elif "delete" in active_tab:
-        element_id = f"delete_{base_id}"
-    elif "create" in active_tab:
-        element_id = base_id
-    else:
+    prefix = TAB_ID_PREFIXES.get(active_tab.split("-")[0])
+    if prefix is None:
         raise Exception(f"Unknown tab: {active_tab}")
+    element_id = prefix + base_id
 
-    element = WebDriverWait(context.driver, context.wait_seconds).until(
+    element = context.wait.until(
         expected_conditions.presence_of_element_located((By.ID, element_id))
     )
     Select(element).select_by_visible_text(text)
@@ -91,22 +139,28 @@ def step_impl(context, text, element_name):
 
 @then('I should see "{text}" in the "{element_name}" dropdown')
 def step_impl(context, text, element_name):
-    element_id = element_name.lower().replace(" ", "_")
-    element = Select(context.driver.find_element(By.ID, element_id))
+    element_id = element_id_for(element_name)
+    element = Select(
+        context.wait.until(
+            expected_conditions.presence_of_element_located((By.ID, element_id))
+        )
+    )
     assert element.first_selected_option.text == text
 
 
 @then('the "{element_name}" field should be empty')
 def step_impl(context, element_name):
-    element_id = element_name.lower().replace(" ", "_")
-    element = context.driver.find_element(By.ID, element_id)
+    element_id = element_id_for(element_name)
+    element = context.wait.until(
+        expected_conditions.presence_of_element_located((By.ID, element_id))
+    )
     assert element.get_attribute("value") == ""
 
 
 @when('I copy the "{element_name}" field')
 def step_impl(context, element_name):
-    element_id = element_name.lower().replace(" ", "_")
-    element = WebDriverWait(context.driver, context.wait_seconds).until(
+    element_id = element_id_for(element_name)
+    element = context.wait.until(
         expected_conditions.presence_of_element_located((By.ID, element_id))
     )
     context.clipboard = element.get_attribute("value")
@@ -115,23 +169,24 @@ def step_impl(context, element_name):
 
 @when('I paste the "{element_name}" field')
 def step_impl(context, element_name):
-    element_id = element_name.lower().replace(" ", "_")
-    element = WebDriverWait(context.driver, context.wait_seconds).until(
+    element_id = element_id_for(element_name)
+    element = context.wait.until(
         expected_conditions.presence_of_element_located((By.ID, element_id))
     )
-    element.clear()
-    element.send_keys(context.clipboard)
+    set_field(context, element, context.clipboard)
 
 
 @when('I press the "{button}" button')
 def step_impl(context, button):
-    button_id = button.lower().replace(" ", "-") + "-btn"
-    context.driver.find_element(By.ID, button_id).click()
+    button_id = button_id_for(button)
+    context.wait.until(
+        expected_conditions.element_to_be_clickable((By.ID, button_id))
+    ).click()
 
 
 @then('I should see "{name}" in the results')
 def step_impl(context, name):
-    found = WebDriverWait(context.driver, context.wait_seconds).until(
+    found = context.wait.until(
         expected_conditions.text_to_be_present_in_element(
             (By.ID, "search_results"), name
         )
@@ -141,13 +196,12 @@ def step_impl(context, name):
 
 @then('I should not see "{name}" in the results')
 def step_impl(context, name):
-    element = context.driver.find_element(By.ID, "search_results")
-    assert name not in element.text
+    assert_text_absent(context, '//*[@id="search_results"]', name)
 
 
 @then('I should see the message "{message}"')
 def step_impl(context, message):
-    found = WebDriverWait(context.driver, context.wait_seconds).until(
+    found = context.wait.until(
         expected_conditions.text_to_be_present_in_element(
             (By.ID, "flash_message"), message
         )
@@ -157,8 +211,8 @@ def step_impl(context, message):
 
 @then('I should see "{text_string}" in the "{element_name}" field')
 def step_impl(context, text_string, element_name):
-    element_id = element_name.lower().replace(" ", "_")
-    found = WebDriverWait(context.driver, context.wait_seconds).until(
+    element_id = element_id_for(element_name)
+    found = context.wait.until(
         expected_conditions.text_to_be_present_in_element_value(
             (By.ID, element_id), text_string
         )
@@ -168,18 +222,22 @@ def step_impl(context, text_string, element_name):
 
 @when('I change "{element_name}" to "{text_string}"')
 def step_impl(context, element_name, text_string):
-    element_id = ID_PREFIX + element_name.lower().replace(" ", "_")
-    element = WebDriverWait(context.driver, context.wait_seconds).until(
+    element_id = ID_PREFIX + element_id_for(element_name)
+    element = context.wait.until(
         expected_conditions.presence_of_element_located((By.ID, element_id))
     )
-    element.clear()
-    element.send_keys(text_string)
+    set_field(context, element, text_string)
 
 
 @when('I switch to the "{tab_name}" tab')
 def step_impl(context, tab_name):
     tab_id = tab_name.lower() + "-tab"
-    context.driver.find_element(By.CSS_SELECTOR, f'a[href="#{tab_id}"]').click()
-    WebDriverWait(context.driver, context.wait_seconds).until(
+    context.wait.until(
+        expected_conditions.element_to_be_clickable(
+            (By.CSS_SELECTOR, f'a[href="#{tab_id}"]')
+        )
+    ).click()
+    context.wait.until(
         expected_conditions.visibility_of_element_located((By.ID, tab_id))
     )
+    context.active_tab = tab_id
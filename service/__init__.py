@@ -22,6 +22,8 @@ import sys
 from flask import Flask
 from service import config
 from service.common import log_handlers
+from service.common.cache import cache
+from service.common.json_provider import OrjsonProvider
 
 
 ############################################################
@@ -32,12 +34,17 @@ def create_app():
     # Create Flask application
     app = Flask(__name__)
     app.config.from_object(config)
+    # Route every jsonify() call through orjson, unsorted and without indentation
+    app.json = OrjsonProvider(app)
+    app.json.sort_keys = False
+    app.json.compact = True
 
     # Initialize Plugins
     # pylint: disable=import-outside-toplevel
     from service.models import db, seed_data
 
     db.init_app(app)
+    cache.init_app(app)
 
     with app.app_context():
         # Dependencies require we import the routes AFTER the Flask app is created
@@ -45,15 +52,16 @@ def create_app():
         from service import routes, models  # noqa: F401 E402
         from service.common import error_handlers, cli_commands  # noqa: F401, E402
 
-        try:
-            # Recreate schema in case of name changes
-            db.drop_all()
-            db.create_all()
-            seed_data()
-        except Exception as error:  # pylint: disable=broad-except
-            app.logger.critical("%s: Cannot continue", error)
-            # gunicorn requires exit code 4 to stop spawning workers when they die
-            sys.exit(4)
+        if app.config["RUN_DB_INIT"]:
+            try:
+                # Recreate schema in case of name changes
+                db.drop_all()
+                db.create_all()
+                seed_data()
+            except Exception as error:  # pylint: disable=broad-except
+                app.logger.critical("%s: Cannot continue", error)
+                # gunicorn requires exit code 4 to stop spawning workers when they die
+                sys.exit(4)
 
         # Set up logging for production
         log_handlers.init_logging(app, "gunicorn.error")
@@ -0,0 +1,58 @@
+######################################################################
+# Copyright 2016, 2024 John J. Rofrano. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+######################################################################
+
+"""
+JSON Provider
+
+This module contains an orjson backed JSON provider so that every
+jsonify() call in the service uses the same fast encoder
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson instead of the json module"""
+
+    def _options(self, sort_keys, indent) -> int:
+        """Maps the json.dumps style arguments onto orjson option flags"""
+        options = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serializes data to a JSON string"""
+        options = self._options(
+            kwargs.get("sort_keys", self.sort_keys), kwargs.get("indent")
+        )
+        return orjson.dumps(obj, default=self.default, option=options).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserializes request bodies and other JSON strings or bytes"""
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serializes the arguments into an application/json response"""
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        options = self._options(self.sort_keys, pretty)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=options) + b"\n",
+            mimetype=self.mimetype,
+        )
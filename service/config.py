@@ -15,6 +15,22 @@ SQLALCHEMY_DATABASE_URI = DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 # SQLALCHEMY_POOL_SIZE = 2
 
+# Rebuild and seed the schema when the app starts; set to 0 on workers whose
+# database is prepared once by a separate "flask db-create" step
+RUN_DB_INIT = os.getenv("RUN_DB_INIT", "1") == "1"
+
+# Cache GET responses in Redis, which every worker and replica shares, so the
+# cache.clear() after a write reaches all of them. Without CACHE_REDIS_URL
+# nothing is cached: an in-process cache would only be cleared in the worker
+# that handled the write
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+CACHE_TYPE = os.getenv("CACHE_TYPE", "RedisCache" if CACHE_REDIS_URL else "NullCache")
+CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "30"))
+
+# DELETE /api/recommendations empties the table and has no authentication,
+# so it only answers when this is 1 (as for the BDD tests) or under TESTING
+ALLOW_DELETE_ALL = os.getenv("ALLOW_DELETE_ALL", "0") == "1"
+
 # Secret for session management
 SECRET_KEY = os.getenv("SECRET_KEY", "sup3r-s3cr3t")
 LOGGING_LEVEL = logging.INFO
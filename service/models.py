@@ -5,10 +5,14 @@ All of the models are stored in this module
 """
 
 import logging
+from operator import attrgetter
 from flask_sqlalchemy import SQLAlchemy
 
 logger = logging.getLogger("flask.app")
 
+# Number of rows fetched per round trip when iterating over query results
+ITER_BATCH_SIZE = 200
+
 # Create the SQLAlchemy object to be initialized later in init_db()
 db = SQLAlchemy()  # pylint: disable=R0903
 
@@ -17,6 +21,7 @@ class DataValidationError(Exception):
     """Used for any data validation errors when deserializing"""
 
 
+# pylint: disable=too-many-public-methods
 class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
     """
     Class that represents a Recommendation
@@ -32,28 +37,56 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
     ##################################################
     # Table Schema
     ##################################################
+    # Each column the list filters match on leads exactly one index;
+    # customer_id and product_id are served by the composite indexes below.
+    # rec_success is left unindexed: like/dislike rewrite it on every click,
+    # and its 0-100 range filter matches too many rows to use an index anyway
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, nullable=False)
     product_id = db.Column(db.Integer, nullable=False)
-    product_name = db.Column(db.String(63), nullable=False)
-    recommend_product_id = db.Column(db.Integer, nullable=False)
-    recommendation_name = db.Column(db.String(63), nullable=False)
-    recommend_type = db.Column(db.String(63), nullable=False)
+    product_name = db.Column(db.String(63), nullable=False, index=True)
+    recommend_product_id = db.Column(db.Integer, nullable=False, index=True)
+    recommendation_name = db.Column(db.String(63), nullable=False, index=True)
+    recommend_type = db.Column(db.String(63), nullable=False, index=True)
     rec_success = db.Column(db.Integer, default=0, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_cust_type", "customer_id", "recommend_type"),
+        db.Index("ix_product_recommend", "product_id", "recommend_product_id"),
+    )
+
+    # Field order used by serialize(); deserialize() reads every field except id
+    _FIELDS = (
+        "id",
+        "customer_id",
+        "product_id",
+        "product_name",
+        "recommendation_name",
+        "recommend_product_id",
+        "recommend_type",
+        "rec_success",
+    )
+    _IN_FIELDS = _FIELDS[1:]
+    _get_fields = attrgetter(*_FIELDS)
+
     def __repr__(self):
         return f"<Recommendation product_id={self.product_id},\
                 recommend_product_id={self.recommend_product_id} id=[{self.id}]>"
 
-    def create(self):
+    def create(self, commit: bool = True):
         """
         Creates a Recommendation to the database
+
+        :param commit: False leaves the commit to the caller, so that many
+            creates are sent together when the caller commits once
+        :type commit: bool
         """
         logger.info("Creating recommendation for product_id =%s", self.product_id)
         self.id = None  # pylint: disable=invalid-name
         try:
             db.session.add(self)
-            db.session.commit()
+            if commit:
+                db.session.commit()
         except Exception as e:
             db.session.rollback()
             logger.error("Error creating record: %s", self)
@@ -84,16 +117,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
 
     def serialize(self):
         """Serializes a Recommendation into a dictionary"""
-        return {
-            "id": self.id,
-            "customer_id": self.customer_id,
-            "product_id": self.product_id,
-            "product_name": self.product_name,
-            "recommendation_name": self.recommendation_name,
-            "recommend_product_id": self.recommend_product_id,
-            "recommend_type": self.recommend_type,
-            "rec_success": self.rec_success,
-        }
+        return dict(zip(self._FIELDS, self._get_fields(self)))
 
     def deserialize(self, data):
         """
@@ -103,13 +127,8 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
             data (dict): A dictionary containing the resource data
         """
         try:
-            self.customer_id = data["customer_id"]
-            self.product_id = data["product_id"]
-            self.product_name = data["product_name"]
-            self.recommend_product_id = data["recommend_product_id"]
-            self.recommendation_name = data["recommendation_name"]
-            self.recommend_type = data["recommend_type"]
-            self.rec_success = data["rec_success"]
+            for field in self._IN_FIELDS:
+                setattr(self, field, data[field])
         except AttributeError as error:
             raise DataValidationError("Invalid attribute: " + error.args[0]) from error
         except KeyError as error:
@@ -133,6 +152,178 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         logger.info("Processing all Recommendations")
         return cls.query.all()
 
+    @classmethod
+    def bulk_create(cls, data: list) -> list:
+        """
+        Creates many Recommendations in the database in a single transaction
+
+        :param data: a list of dictionaries containing the resource data
+        :type data: list
+
+        :return: the created Recommendations serialized as dictionaries
+        :rtype: list
+        """
+        logger.info("Creating %d recommendations in bulk", len(data))
+        recommendations = [cls().deserialize(item) for item in data]
+        try:
+            db.session.add_all(recommendations)
+            # flush sends one batched INSERT ... RETURNING for every row
+            db.session.flush()
+            results = [recommendation.serialize() for recommendation in recommendations]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error creating records in bulk")
+            raise DataValidationError(e) from e
+        return results
+
+    @classmethod
+    def remove_by_id(cls, by_id: int):
+        """
+        Removes a Recommendation by its ID with a single DELETE ... RETURNING
+
+        :param by_id: the id of the Recommendation to delete
+        :type by_id: int
+
+        :return: the id of the deleted Recommendation or None if not found
+        :rtype: int
+        """
+        logger.info("Deleting %s", by_id)
+        try:
+            deleted_id = db.session.execute(
+                db.delete(cls).where(cls.id == by_id).returning(cls.id)
+            ).scalar()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error deleting record: %s", by_id)
+            raise DataValidationError(e) from e
+        return deleted_id
+
+    @classmethod
+    def remove_by_products(cls, product_id: int, recommend_product_id: int):
+        """
+        Removes the first Recommendation linking two products in one statement
+
+        :param product_id: the product_id of the Recommendation
+        :type product_id: int
+        :param recommend_product_id: the id of the recommended product
+        :type recommend_product_id: int
+
+        :return: the id of the deleted Recommendation or None if not found
+        :rtype: int
+        """
+        logger.info(
+            "Deleting recommendation of %s for %s", recommend_product_id, product_id
+        )
+        first_match = (
+            db.select(cls.id)
+            .where(
+                cls.product_id == product_id,
+                cls.recommend_product_id == recommend_product_id,
+            )
+            .limit(1)
+            .scalar_subquery()
+        )
+        try:
+            deleted_id = db.session.execute(
+                db.delete(cls).where(cls.id == first_match).returning(cls.id)
+            ).scalar()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                "Error deleting recommendation of %s for %s",
+                recommend_product_id,
+                product_id,
+            )
+            raise DataValidationError(e) from e
+        return deleted_id
+
+    @classmethod
+    def update_by_id(cls, by_id: int, data: dict):
+        """
+        Updates the fields present in data with a single UPDATE ... RETURNING
+
+        :param by_id: the id of the Recommendation to update
+        :type by_id: int
+        :param data: a dictionary with any of the Recommendation fields
+        :type data: dict
+
+        :return: the updated Recommendation serialized as a dictionary or None
+        :rtype: dict
+        """
+        logger.info("Saving %s", by_id)
+        values = {field: data[field] for field in cls._IN_FIELDS if field in data}
+        if not values:
+            recommendation = cls.find(by_id)
+            return recommendation.serialize() if recommendation else None
+        try:
+            recommendation = db.session.execute(
+                db.update(cls).where(cls.id == by_id).values(values).returning(cls)
+            ).scalar()
+            result = recommendation.serialize() if recommendation else None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error updating record: %s", by_id)
+            raise DataValidationError(e) from e
+        return result
+
+    @classmethod
+    def adjust_success(cls, by_id: int, step: int):
+        """
+        Moves the rec_success of a Recommendation by step in one atomic UPDATE
+
+        The score is only raised while below 100 and only lowered while above 0
+
+        :param by_id: the id of the Recommendation to update
+        :type by_id: int
+        :param step: the amount to add to rec_success, e.g. 1 or -1
+        :type step: int
+
+        :return: the updated Recommendation serialized as a dictionary or None
+        :rtype: dict
+        """
+        logger.info("Adjusting rec_success of %s by %d", by_id, step)
+        in_range = cls.rec_success < 100 if step > 0 else cls.rec_success > 0
+        try:
+            recommendation = db.session.execute(
+                db.update(cls)
+                .where(cls.id == by_id)
+                .values(
+                    rec_success=db.case(
+                        (in_range, cls.rec_success + step), else_=cls.rec_success
+                    )
+                )
+                .returning(cls)
+            ).scalar()
+            result = recommendation.serialize() if recommendation else None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error updating record: %s", by_id)
+            raise DataValidationError(e) from e
+        return result
+
+    @classmethod
+    def remove_all(cls) -> int:
+        """
+        Removes all of the Recommendations from the database
+
+        :return: the number of Recommendations deleted
+        :rtype: int
+        """
+        logger.info("Deleting all Recommendations")
+        try:
+            count = db.session.query(cls).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error deleting all records")
+            raise DataValidationError(e) from e
+        return count
+
     @classmethod
     def find(cls, by_id):
         """
@@ -145,7 +336,61 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: Recommendation
         """
         logger.info("Processing lookup for recommendation id=%s ...", by_id)
-        return cls.query.session.get(cls, by_id)
+        return db.session.get(cls, by_id)
+
+    @classmethod
+    def find_by(cls, **filters) -> list:
+        """
+        Finds all Recommendations whose columns equal the given values
+
+        :param filters: column names mapped to the values to match
+        :type filters: dict
+
+        :return: a list of Recommendations matching every filter
+        :rtype: list
+        """
+        query = db.select(cls)
+        for column, value in filters.items():
+            query = query.where(getattr(cls, column) == value)
+        return db.session.scalars(query).all()
+
+    @classmethod
+    def find_rows(cls, *criteria) -> list:
+        """
+        Finds the Recommendations matching every criterion as dictionaries
+
+        Only the serialized columns are selected, so no ORM objects are built
+
+        :param criteria: SQL expressions that the rows must satisfy
+        :type criteria: list
+
+        :return: a list of serialized Recommendations
+        :rtype: list
+        """
+        columns = [getattr(cls, field) for field in cls._FIELDS]
+        rows = db.session.execute(db.select(*columns).where(*criteria))
+        return [row._asdict() for row in rows]
+
+    @classmethod
+    def iter_by(cls, **filters):
+        """
+        Iterates over the Recommendations whose columns equal the given values
+
+        Rows are fetched from the database in batches of ITER_BATCH_SIZE
+        instead of being loaded into a list all at once
+
+        :param filters: column names mapped to the values to match
+        :type filters: dict
+
+        :return: an iterator of Recommendations matching every filter
+        :rtype: ScalarResult
+        """
+        query = (
+            db.select(cls)
+            .filter_by(**filters)
+            .execution_options(yield_per=ITER_BATCH_SIZE)
+        )
+        return db.session.scalars(query)
 
     @classmethod
     def find_by_product_id(cls, product_id: int) -> list:
@@ -159,7 +404,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: list
         """
         logger.info("Processing product_id query for %s ...", product_id)
-        return cls.query.filter(cls.product_id == product_id).all()
+        return cls.find_by(product_id=product_id)
 
     @classmethod
     def find_by_customer_id(cls, customer_id: int) -> list:
@@ -173,7 +418,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: list
         """
         logger.info("Processing customer_id query for %s ...", customer_id)
-        return cls.query.filter(cls.customer_id == customer_id).all()
+        return cls.find_by(customer_id=customer_id)
 
     @classmethod
     def find_by_recommend_type(cls, recommend_type: str) -> list:
@@ -187,7 +432,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: list
         """
         logger.info("Processing recommend_type query for %s ...", recommend_type)
-        return cls.query.filter(cls.recommend_type == recommend_type).all()
+        return cls.find_by(recommend_type=recommend_type)
 
     @classmethod
     def find_by_recommend_product_id(cls, recommend_product_id: int) -> list:
@@ -203,7 +448,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         logger.info(
             "Processing recommend_product_id query for %s ...", recommend_product_id
         )
-        return cls.query.filter(cls.recommend_product_id == recommend_product_id).all()
+        return cls.find_by(recommend_product_id=recommend_product_id)
 
     @classmethod
     def find_by_product_name(cls, product_name: str) -> list:
@@ -217,7 +462,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: list
         """
         logger.info("Processing product_name query for %s ...", product_name)
-        return cls.query.filter(cls.product_name == product_name).all()
+        return cls.find_by(product_name=product_name)
 
     @classmethod
     def find_by_recommendation_name(cls, recommendation_name: str) -> list:
@@ -233,7 +478,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         logger.info(
             "Processing recommendation_name query for %s ...", recommendation_name
         )
-        return cls.query.filter(cls.recommendation_name == recommendation_name).all()
+        return cls.find_by(recommendation_name=recommendation_name)
 
     @classmethod
     def find_by_rec_success(cls, rec_success: int) -> list:
@@ -247,7 +492,7 @@ class Recommendation(db.Model):  # pylint: disable=too-many-instance-attributes
         :rtype: list
         """
         logger.info("Processing rec_success query for %s ...", rec_success)
-        return cls.query.filter(cls.rec_success == rec_success).all()
+        return cls.find_by(rec_success=rec_success)
 
 
 def seed_data():
@@ -348,7 +593,4 @@ def seed_data():
             },
         ]
 
-        for data in sample_recommendations:
-            rec = Recommendation()
-            rec.deserialize(data)
-            rec.create()
+        Recommendation.bulk_create(sample_recommendations)
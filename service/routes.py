@@ -21,11 +21,31 @@ This service implements a REST API that allows you to Create, Read, Update
 and Delete Recommendations
 """
 
-from flask import jsonify, request, url_for, abort
+import os
+import hashlib
+from functools import lru_cache
+import orjson
+from flask import jsonify, request, abort, Response, stream_with_context
 from flask import current_app as app  # Import Flask application
 from service.models import Recommendation
 from service.common import status  # HTTP Status Codes
-from service.models import db
+from service.common.cache import cache
+
+# Path of the Recommendation collection, used to build Location headers
+BASE_PATH = "/api/recommendations"
+# Query filters that must be integers and the column each one matches
+INT_FILTERS = (
+    ("product_id", Recommendation.product_id),
+    ("customer_id", Recommendation.customer_id),
+    ("recommend_product_id", Recommendation.recommend_product_id),
+)
+# Query filters matched as exact strings
+TEXT_FILTERS = (
+    ("product_name", Recommendation.product_name),
+    ("recommendation_name", Recommendation.recommendation_name),
+)
+RECOMMEND_TYPES = ("Up-Sell", "Down-Sell", "Cross-Sell")
+VALID_RECOMMEND_TYPES = frozenset(RECOMMEND_TYPES)
 
 
 ######################################################################
@@ -55,7 +75,12 @@ def health_check():
 @app.route("/")
 def index():
     """Base URL for our service"""
-    return app.send_static_file("index.html")
+    body, etag = read_index_page() if app.debug else index_page()
+    response = Response(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 
 ######################################################################
@@ -81,20 +106,9 @@ def delete_recommendation(product_id, recommend_product_id):
         recommend_product_id,
     )
 
-    # Find the Recommendation in the database
-    recommendation = Recommendation.query.filter_by(
-        product_id=product_id, recommend_product_id=recommend_product_id
-    ).first()
-
-    # If the recommendation exists, delete it
-    if recommendation:
-        app.logger.info(
-            "Recommendation found for product_id: %d and recommend_product_id: %d",
-            product_id,
-            recommend_product_id,
-        )
-        db.session.delete(recommendation)
-        db.session.commit()
+    # Find and delete the first match with a single DELETE ... RETURNING
+    if Recommendation.remove_by_products(product_id, recommend_product_id) is not None:
+        cache.clear()
         app.logger.info(
             "Recommendation with product_id: %d and recommend_product_id: %d deleted successfully.",
             product_id,
@@ -134,12 +148,11 @@ def create_recommendations():
 
     # Save the new Recommendation to the database
     recommendation.create()
+    cache.clear()
     app.logger.info("Recommendation with new id [%s] saved!", recommendation.id)
 
     # Return the location of the new Recommendation
-    location_url = url_for(
-        "get_recommendations", recommendation_id=recommendation.id, _external=True
-    )
+    location_url = f"{request.url_root.rstrip('/')}{BASE_PATH}/{recommendation.id}"
 
     return (
         jsonify(recommendation.serialize()),
@@ -148,62 +161,78 @@ def create_recommendations():
     )
 
 
+######################################################################
+# CREATE MANY RECOMMENDATIONS
+######################################################################
+@app.route("/api/recommendations/bulk", methods=["POST"])
+def bulk_create_recommendations():
+    """
+    Create many Recommendations
+    This endpoint will create every Recommendation in the JSON array in the request body
+    """
+    app.logger.info("Request to Create Recommendations in bulk...")
+    check_content_type("application/json")
+
+    data = request.get_json()
+    if not isinstance(data, list):
+        abort(
+            status.HTTP_400_BAD_REQUEST,
+            "Request body must be a list of recommendations.",
+        )
+
+    results = Recommendation.bulk_create(data)
+    app.logger.info("%d recommendations saved!", len(results))
+
+    cache.clear()
+    return jsonify(results), status.HTTP_201_CREATED
+
+
 ######################################################################
 # LIST ALL RECOMMENDATIONS
 ######################################################################
 @app.route("/api/recommendations", methods=["GET"])
-def list_recommendations():  # pylint: disable=too-many-branches, too-many-return-statements
+# The unfiltered list is streamed, so only filtered responses are cached,
+# and only when they succeed
+@cache.cached(
+    query_string=True,
+    unless=lambda: not request.args,
+    response_filter=lambda result: result[1] == status.HTTP_200_OK,
+)
+def list_recommendations():
     """Returns all of the Recommendations, with optional filtering"""
     app.logger.info("Request for recommendation list with filters")
 
-    # Retrieve query parameters
-    product_id = request.args.get("product_id")
-    customer_id = request.args.get("customer_id")
-    recommend_type = request.args.get("recommend_type")
-    recommend_product_id = request.args.get("recommend_product_id")
-    product_name = request.args.get("product_name")
-    recommendation_name = request.args.get("recommendation_name")
+    if not request.args:
+        return json_stream_response(Recommendation.iter_by()), status.HTTP_200_OK
+
     rec_success_min = request.args.get("rec_success_min")
     rec_success_max = request.args.get("rec_success_max")
 
-    query = Recommendation.query
-    valid_recommend_types = ["Up-Sell", "Down-Sell", "Cross-Sell"]
-
-    if product_id:
-        if not product_id.isdigit():
-            return jsonify(error="Invalid product_id"), status.HTTP_400_BAD_REQUEST
-        query = query.filter(Recommendation.product_id == int(product_id))
+    # Every filter becomes one predicate of a single SELECT
+    predicates = []
 
-    if customer_id:
-        if not customer_id.isdigit():
-            return jsonify(error="Invalid customer_id"), status.HTTP_400_BAD_REQUEST
-        query = query.filter(Recommendation.customer_id == int(customer_id))
+    for name, column in INT_FILTERS:
+        value = request.args.get(name)
+        if value:
+            if not value.isdigit():
+                return jsonify(error=f"Invalid {name}"), status.HTTP_400_BAD_REQUEST
+            predicates.append(column == int(value))
 
+    recommend_type = request.args.get("recommend_type")
     if recommend_type:
-        if recommend_type not in valid_recommend_types:
+        if recommend_type not in VALID_RECOMMEND_TYPES:
             return (
                 jsonify(
-                    error=f"Invalid recommend_type. Must be one of {valid_recommend_types}"
+                    error=f"Invalid recommend_type. Must be one of {list(RECOMMEND_TYPES)}"
                 ),
                 status.HTTP_400_BAD_REQUEST,
             )
-        query = query.filter(Recommendation.recommend_type == recommend_type)
+        predicates.append(Recommendation.recommend_type == recommend_type)
 
-    if recommend_product_id:
-        if not recommend_product_id.isdigit():
-            return (
-                jsonify(error="Invalid recommend_product_id"),
-                status.HTTP_400_BAD_REQUEST,
-            )
-        query = query.filter(
-            Recommendation.recommend_product_id == int(recommend_product_id)
-        )
-
-    if product_name:
-        query = query.filter(Recommendation.product_name == product_name)
-
-    if recommendation_name:
-        query = query.filter(Recommendation.recommendation_name == recommendation_name)
+    for name, column in TEXT_FILTERS:
+        value = request.args.get(name)
+        if value:
+            predicates.append(column == value)
 
     if rec_success_min and rec_success_max:
         if not rec_success_min.isdigit() or not rec_success_max.isdigit():
@@ -220,13 +249,9 @@ def list_recommendations():  # pylint: disable=too-many-branches, too-many-retur
                 status.HTTP_400_BAD_REQUEST,
             )
 
-        query = query.filter(
-            Recommendation.rec_success >= min_val, Recommendation.rec_success <= max_val
-        )
+        predicates.append(Recommendation.rec_success.between(min_val, max_val))
 
-    recommendations = query.all()
-    results = [recommendation.serialize() for recommendation in recommendations]
-    return jsonify(results), status.HTTP_200_OK
+    return json_list_response(Recommendation.find_rows(*predicates)), status.HTTP_200_OK
 
 
 ######################################################################
@@ -267,37 +292,21 @@ def update_recommendations(recommendation_id):
     app.logger.info("Request to update recommendation with id: %d", recommendation_id)
     check_content_type("application/json")
 
-    recommendation = Recommendation.find(recommendation_id)
-    if not recommendation:
+    data = request.get_json()
+
+    # Update only fields that are present, in a single UPDATE ... RETURNING
+    result = Recommendation.update_by_id(recommendation_id, data or {})
+    if result is None:
         abort(
             status.HTTP_404_NOT_FOUND,
             f"Recommendation with id: '{recommendation_id}' was not found.",
         )
-
-    data = request.get_json()
     if not data:
         abort(status.HTTP_400_BAD_REQUEST, "No data provided for update.")
+    cache.clear()
 
-    # Update only fields that are present
-    if "customer_id" in data:
-        recommendation.customer_id = data["customer_id"]
-    if "product_id" in data:
-        recommendation.product_id = data["product_id"]
-    if "product_name" in data:
-        recommendation.product_name = data["product_name"]
-    if "recommendation_name" in data:
-        recommendation.recommendation_name = data["recommendation_name"]
-    if "recommend_product_id" in data:
-        recommendation.recommend_product_id = data["recommend_product_id"]
-    if "recommend_type" in data:
-        recommendation.recommend_type = data["recommend_type"]
-    if "rec_success" in data:
-        recommendation.rec_success = data["rec_success"]
-
-    recommendation.update()
-
-    app.logger.info("Recommendation with ID: %d updated.", recommendation.id)
-    return jsonify(recommendation.serialize()), status.HTTP_200_OK
+    app.logger.info("Recommendation with ID: %d updated.", recommendation_id)
+    return jsonify(result), status.HTTP_200_OK
 
 
 @app.route(
@@ -323,6 +332,7 @@ def link_recommendation_product(recommendation_id, recommend_product_id):
 
     recommendation.recommend_product_id = recommend_product_id
     recommendation.update()
+    cache.clear()
 
     app.logger.info(
         "Recommendation %d now links to recommended product %d",
@@ -338,18 +348,15 @@ def like_recommendation(recommendation_id):
     """Increments the success rate of a recommendation by 1"""
     app.logger.info("Request to LIKE recommendation with id [%s]", recommendation_id)
 
-    recommendation = Recommendation.find(recommendation_id)
-    if not recommendation:
+    result = Recommendation.adjust_success(recommendation_id, 1)
+    if result is None:
         abort(
             status.HTTP_404_NOT_FOUND,
             f"Recommendation with id '{recommendation_id}' was not found.",
         )
 
-    if recommendation.rec_success < 100:
-        recommendation.rec_success += 1
-        recommendation.update()
-
-    return jsonify(recommendation.serialize()), status.HTTP_200_OK
+    cache.clear()
+    return jsonify(result), status.HTTP_200_OK
 
 
 @app.route("/api/recommendations/<int:recommendation_id>/dislike", methods=["PUT"])
@@ -359,19 +366,16 @@ def dislike_recommendation(recommendation_id):
     """
     app.logger.info("Disliking recommendation with id [%s]", recommendation_id)
 
-    recommendation = Recommendation.find(recommendation_id)
-    if not recommendation:
+    # The update itself prevents negative values
+    result = Recommendation.adjust_success(recommendation_id, -1)
+    if result is None:
         abort(
             status.HTTP_404_NOT_FOUND,
             f"Recommendation with id '{recommendation_id}' was not found.",
         )
 
-    # Prevent negative values if needed
-    if recommendation.rec_success > 0:
-        recommendation.rec_success -= 1
-        recommendation.update()
-
-    return jsonify(recommendation.serialize()), status.HTTP_200_OK
+    cache.clear()
+    return jsonify(result), status.HTTP_200_OK
 
 
 ######################################################################
@@ -383,20 +387,43 @@ def delete_recommendations(recommendation_id):
     Delete a Recommendation
     This endpoint will delete a Recommendation based the id specified in the path
     """
-    recommendation = Recommendation.find(recommendation_id)
-    if not recommendation:
+    if Recommendation.remove_by_id(recommendation_id) is None:
         abort(
             status.HTTP_404_NOT_FOUND,
             f"Recommendation with id '{recommendation_id}' was not found.",
         )
 
-    recommendation.delete()
+    cache.clear()
+
     return (
         jsonify(message="Recommendation deleted successfully."),
         status.HTTP_204_NO_CONTENT,
     )
 
 
+######################################################################
+#  DELETE ALL RECOMMENDATIONS
+######################################################################
+@app.route("/api/recommendations", methods=["DELETE"])
+def delete_all_recommendations():
+    """
+    Delete all Recommendations
+    This endpoint will remove every Recommendation in a single statement,
+    when ALLOW_DELETE_ALL is set or the app is under test
+    """
+    app.logger.info("Request to Delete all recommendations...")
+    if not (app.config["ALLOW_DELETE_ALL"] or app.testing):
+        abort(
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+            valid_methods=["GET", "POST"],
+            description="Deleting all recommendations is disabled; set ALLOW_DELETE_ALL=1 to allow it.",
+        )
+    count = Recommendation.remove_all()
+    cache.clear()
+    app.logger.info("%d recommendations deleted.", count)
+    return {}, status.HTTP_204_NO_CONTENT
+
+
 ######################################################################
 #  U T I L I T Y   F U N C T I O N S
 ######################################################################
@@ -405,23 +432,67 @@ def delete_recommendations(recommendation_id):
 ######################################################################
 def check_content_type(content_type) -> None:
     """Checks that the media type is correct"""
-    if "Content-Type" not in request.headers:
-        app.logger.error("No Content-Type specified.")
-        abort(
-            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            f"Content-Type must be {content_type}",
-        )
-
-    if request.headers["Content-Type"] == content_type:
+    # Read the header once and log what the client actually sent
+    request_type = request.headers.get("Content-Type")
+    if request_type == content_type:
         return
 
-    app.logger.error("Invalid Content-Type: %s", request.headers["Content-Type"])
+    if request_type is None:
+        app.logger.error("No Content-Type specified.")
+    else:
+        app.logger.error("Invalid Content-Type: %s", request_type)
     abort(
         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
         f"Content-Type must be {content_type}",
     )
 
 
+######################################################################
+# Encodes a list of serialized Recommendations as a JSON array response
+######################################################################
+def json_list_response(results) -> Response:
+    """Serializes the Recommendation dictionaries with a single orjson.dumps call"""
+    return Response(orjson.dumps(results), mimetype="application/json")
+
+
+######################################################################
+# Streams a JSON array while the Recommendations are read from the database
+######################################################################
+def json_stream_response(recommendations) -> Response:
+    """Encodes each Recommendation with orjson as the cursor advances"""
+
+    def generate():
+        yield b"["
+        separator = b""
+        for rec in recommendations:
+            yield separator + orjson.dumps(rec.serialize())
+            separator = b","
+        yield b"]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+######################################################################
+# Reads the home page with an ETag computed from its bytes
+######################################################################
+def read_index_page() -> tuple:
+    """Returns the bytes of index.html and an ETag computed from them"""
+    with open(os.path.join(app.static_folder, "index.html"), "rb") as page:
+        body = page.read()
+    # The hash only tags a version of the page, so FIPS builds allow it
+    return body, hashlib.md5(body, usedforsecurity=False).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def index_page() -> tuple:
+    """Returns read_index_page() as read the first time
+
+    Edits to index.html are not served until the process restarts, so
+    index() calls read_index_page() directly in debug mode
+    """
+    return read_index_page()
+
+
 ######################################################################
 # Logs error messages before aborting
 ######################################################################
@@ -1,13 +1,182 @@
+import os
+import logging
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 import pytest
-from service import create_app
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+from service import config as service_config
+from service.models import db, Recommendation
+from .factories import RecommendationFactory
+
+# The suite needs nothing Postgres-specific, so unless DATABASE_URI says
+# otherwise (as CI and the dev container do) it runs on in-memory SQLite
+DATABASE_URI = os.getenv("DATABASE_URI", "sqlite:///:memory:")
+
+
+def worker_database_uri(uri: str, worker: str) -> str:
+    """Returns a copy of uri naming a database of the worker's own
+
+    Postgres databases are created on first use. SQLite files just get a
+    new name, and in-memory SQLite is already private to the process
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return uri
+        root, ext = os.path.splitext(url.database)
+        return url.set(database=f"{root}_{worker}{ext}").render_as_string(False)
+    name = f"{url.database}_{worker}"
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    with engine.connect() as connection:
+        exists = connection.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}
+        )
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+    return url.set(database=name).render_as_string(False)
+
+
+def pytest_configure():
+    """Points the service, and each pytest-xdist worker, at the test database"""
+    global DATABASE_URI
+    worker = os.getenv("PYTEST_XDIST_WORKER")
+    if worker:
+        DATABASE_URI = worker_database_uri(DATABASE_URI, worker)
+    # service.config was read when this file imported the service package,
+    # and the test modules read the variable when they are collected
+    os.environ["DATABASE_URI"] = DATABASE_URI
+    service_config.DATABASE_URI = DATABASE_URI
+    service_config.SQLALCHEMY_DATABASE_URI = DATABASE_URI
+    # The test client runs in one process, so an in-process cache stands in
+    # for the Redis one the service uses when deployed
+    service_config.CACHE_TYPE = "SimpleCache"
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The service app, with its context pushed once for the whole session"""
+    # Imported here so the app is built after pytest_configure has run
+    from wsgi import app as service_app  # pylint: disable=import-outside-toplevel
+
+    service_app.config["TESTING"] = True
+    service_app.config["DEBUG"] = False
+    service_app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URI
+    service_app.logger.setLevel(logging.CRITICAL)
+    # SQLAlchemy logs every statement at INFO, so keep it quiet even when
+    # pytest runs with --log-level=DEBUG
+    for name in ("sqlalchemy.engine", "sqlalchemy.pool"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    context = service_app.app_context()
+    context.push()
+    yield service_app
+    context.pop()
+
+
+@pytest.fixture(scope="session")
+def client(app):  # pylint: disable=redefined-outer-name
+    """A test client for the service app
+
+    The service sets no cookies, so one client can serve every test
+    """
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def database(app):  # pylint: disable=redefined-outer-name,unused-argument
+    """The database with its tables created"""
+    db.create_all()
+    return db
+
+
+@pytest.fixture(scope="module")
+def db_connection(database):  # pylint: disable=redefined-outer-name
+    """One connection per module running inside a transaction that is never committed"""
+    connection = database.engine.connect()
+    transaction = connection.begin()
+    connection.execute(Recommendation.__table__.delete())  # start from an empty table
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
+@contextmanager
+def bound_session(connection, **options):
+    """Swaps in a session on connection for the duration of the block
+
+    The session joins the connection's transaction with SAVEPOINTs, so
+    commit() in the models only releases a savepoint
+    """
+    app_session = db.session
+    db.session = scoped_session(
+        sessionmaker(
+            bind=connection, join_transaction_mode="create_savepoint", **options
+        )
+    )
+    try:
+        yield db.session
+    finally:
+        db.session.remove()
+        db.session = app_session
+
+
+@pytest.fixture
+def session_options():
+    """Extra sessionmaker options for db_session, override it to change them"""
+    return {}
+
+
+@pytest.fixture
+def db_session(request):
+    """A session whose writes are rolled back after each test
+
+    Tests marked no_db get no session and never touch the database
+    """
+    if request.node.get_closest_marker("no_db"):
+        yield None
+        return
+    connection = request.getfixturevalue("db_connection")
+    options = request.getfixturevalue("session_options")
+    savepoint = connection.begin_nested()
+    with bound_session(connection, **options) as session:
+        yield session
+    savepoint.rollback()  # undo everything the test wrote
 
 
 @pytest.fixture
-def client():
-    app = create_app()
-    app.config["TESTING"] = True
-    app.config["PROPAGATE_EXCEPTIONS"] = False  # 让 Flask 处理异常而不是直接抛出
+def broken_commit(db_session, monkeypatch):  # pylint: disable=redefined-outer-name
+    """Makes every commit on the test session fail"""
+    monkeypatch.setattr(
+        db_session, "commit", MagicMock(side_effect=Exception("DB failure"))
+    )
+
+
+@pytest.fixture
+def query_counter(database):  # pylint: disable=redefined-outer-name
+    """Counts the SELECT statements sent to the database
+
+    Reset selects to 0 right before the code under test runs
+    """
+    counter = SimpleNamespace(selects=0)
+
+    def count(_conn, _cursor, statement, *_args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            counter.selects += 1
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    yield counter
+    event.remove(database.engine, "before_cursor_execute", count)
+
+
+@pytest.fixture(scope="session")
+def recommendation_data():
+    """Field values for one valid Recommendation, generated once per session
 
-    with app.app_context():
-        with app.test_client() as client:
-            yield client
+    Tests must copy it before changing it
+    """
+    data = RecommendationFactory.build().serialize()
+    del data["id"]
+    return data
@@ -17,8 +17,21 @@ class RecommendationFactory(factory.Factory):
     id = factory.Sequence(lambda n: n)
     product_id = factory.Sequence(lambda n: n + 100)
     customer_id = factory.Sequence(lambda n: n + 200)
-    product_name = factory.Faker("word")
-    recommendation_name = factory.Faker("word")
+    product_name = factory.Sequence(lambda n: f"product_{n}")
+    recommendation_name = factory.Sequence(lambda n: f"recommendation_{n}")
     recommend_type = factory.Iterator(["Up-Sell", "Cross-Sell", "Down-Sell"])
     recommend_product_id = factory.Sequence(lambda n: n + 300)
-    rec_success = factory.Faker("random_int", min=0, max=100)
+    # Stays below 100 so a like always has room to count
+    rec_success = factory.Sequence(lambda n: n % 100)
+
+    @classmethod
+    def bulk_create(cls, size, **kwargs):
+        """Saves a batch of Recommendations with one INSERT and one commit
+
+        Returns the built instances, with the ids the database gave them
+        """
+        batch = cls.build_batch(size, **kwargs)
+        results = Recommendation.bulk_create([item.serialize() for item in batch])
+        for item, result in zip(batch, results):
+            item.id = result["id"]
+        return batch
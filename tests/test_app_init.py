@@ -1,10 +1,10 @@
 import pytest
+from service import create_app
+from service.models import db
 
 
 def test_app_init_fails(monkeypatch):
     """Test app exits if db.create_all() fails"""
-    from service import create_app
-    from service.models import db
 
     def fail_create_all():
         raise RuntimeError("Fake DB failure")
@@ -18,3 +18,26 @@ def test_app_init_fails(monkeypatch):
     with pytest.raises(SystemExit) as excinfo:
         create_app()
     assert excinfo.value.code == 4
+
+
+def test_app_init_skips_db_setup(monkeypatch):
+    """Test app does not touch the schema when RUN_DB_INIT is off"""
+
+    def fail_create_all():
+        raise RuntimeError("create_all should not run")
+
+    monkeypatch.setattr("service.config.RUN_DB_INIT", False)
+    monkeypatch.setattr(db, "create_all", fail_create_all)
+    monkeypatch.setattr(db, "drop_all", fail_create_all)
+
+    app = create_app()
+    assert app.config["RUN_DB_INIT"] is False
+
+
+def test_app_json_is_compact_and_unsorted(app):
+    """It should emit compact JSON in field order"""
+    assert app.json.sort_keys is False
+    assert app.json.compact is True
+    with app.app_context():
+        resp = app.json.response(b=1, a=2)
+    assert resp.get_data() == b'{"b":1,"a":2}\n'
@@ -1,17 +1,44 @@
+import pytest
+from flask import request
+from service import create_app
 from service.common import status
 
 
-def test_415_unsupported_media_type(client):
-    """Trigger 415 Unsupported Media Type"""
+def dummy_post():
+    """Answers like a route that only accepts JSON"""
+    if request.content_type != "application/json":
+        return "Unsupported Media Type", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    return "OK", 200
+
+
+def broken():
+    """Fails the way a route with an unexpected error does"""
+    raise Exception("boom")
 
-    @client.application.route("/recommendations", methods=["POST"])
-    def dummy_post():
-        from flask import request
 
-        if request.content_type != "application/json":
-            return "Unsupported Media Type", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
-        return "OK", 200
+@pytest.fixture(scope="module", name="client")
+def fresh_client():
+    """A client for a fresh app, since routes cannot be added to one that served requests"""
+    flask_app = create_app()
+    flask_app.config["TESTING"] = True
+    flask_app.config["PROPAGATE_EXCEPTIONS"] = False  # 让 Flask 处理异常而不是直接抛出
 
+    with flask_app.app_context():
+        with flask_app.test_client() as test_client:
+            yield test_client
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _register_dummy_routes(client):
+    """Adds the routes these tests trigger once, before the first request"""
+    client.application.add_url_rule(
+        "/recommendations", view_func=dummy_post, methods=["POST"]
+    )
+    client.application.add_url_rule("/trigger500", view_func=broken)
+
+
+def test_415_unsupported_media_type(client):
+    """Trigger 415 Unsupported Media Type"""
     response = client.post(
         "/recommendations", data="bad data", content_type="text/plain"
     )
@@ -21,11 +48,6 @@ def test_415_unsupported_media_type(client):
 
 def test_500_internal_server_error(client):
     """Trigger 500 Internal Server Error"""
-
-    @client.application.route("/trigger500")
-    def broken():
-        raise Exception("boom")
-
     response = client.get("/trigger500")
     assert response.status_code == 500
     assert "Internal Server Error" in response.get_data(as_text=True)
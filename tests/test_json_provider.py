@@ -0,0 +1,64 @@
+"""
+Test cases for the orjson JSON provider
+"""
+
+from decimal import Decimal
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.exceptions import BadRequest
+from service.common.json_provider import OrjsonProvider
+
+
+def make_app(debug=False):
+    """Creates a bare Flask app that uses the orjson provider"""
+    app = Flask(__name__)
+    app.debug = debug
+    app.json = OrjsonProvider(app)
+    return app
+
+
+def test_jsonify_uses_orjson_provider():
+    """It should encode jsonify() responses with the orjson provider"""
+    app = make_app()
+    with app.app_context():
+        resp = jsonify(b=1, a=[1, 2])
+    assert resp.mimetype == "application/json"
+    assert resp.get_data() == b'{"a":[1,2],"b":1}\n'
+
+
+def test_dumps_honors_sort_keys_and_indent():
+    """It should map sort_keys and indent onto orjson options"""
+    app = make_app()
+    assert app.json.dumps({"b": 1, "a": 2}, sort_keys=False) == '{"b":1,"a":2}'
+    assert app.json.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    assert app.json.dumps({"a": 1}, indent=2) == '{\n  "a": 1\n}'
+
+
+def test_response_is_indented_in_debug():
+    """It should pretty print responses when the app is in debug mode"""
+    app = make_app(debug=True)
+    with app.app_context():
+        resp = jsonify(a=1)
+    assert resp.get_data() == b'{\n  "a": 1\n}\n'
+
+
+def test_default_handles_non_native_types():
+    """It should fall back to the Flask default for types orjson lacks"""
+    app = make_app()
+    assert app.json.dumps({"price": Decimal("1.50")}) == '{"price":"1.50"}'
+    assert app.json.dumps({1: "one"}) == '{"1":"one"}'
+
+
+def test_loads_parses_request_bodies():
+    """It should parse request JSON with orjson"""
+    app = make_app()
+    assert app.json.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    with app.test_request_context(
+        method="POST", data=b'{"id": 7}', content_type="application/json"
+    ):
+        assert request.get_json() == {"id": 7}
+    with app.test_request_context(
+        method="POST", data=b"{bad", content_type="application/json"
+    ):
+        with pytest.raises(BadRequest):
+            request.get_json()
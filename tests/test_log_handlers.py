@@ -1,33 +1,43 @@
-from service.common import log_handlers
-from service import create_app
 import logging
+import pytest
+from service.common import log_handlers
 
+# Built once and reused for the formatter check
+RECORD = logging.LogRecord(
+    name="test",
+    level=logging.INFO,
+    pathname=__file__,
+    lineno=10,
+    msg="message",
+    args=(),
+    exc_info=None,
+)
 
-def test_init_logging_sets_formatter_and_level():
-    """It should initialize the app logger with correct formatter"""
-    app = create_app()
 
+@pytest.fixture(name="app_logger")
+def restored_app_logger(app, monkeypatch):
+    """The shared app's logger, put back the way it was after the test"""
+    level = app.logger.level
+    monkeypatch.setattr(app.logger, "handlers", list(app.logger.handlers))
+    monkeypatch.setattr(app.logger, "propagate", app.logger.propagate)
+    yield app.logger
+    app.logger.setLevel(level)  # also clears the logger's isEnabledFor cache
+
+
+def test_init_logging_sets_formatter_and_level(app, app_logger):
+    """It should initialize the app logger with correct formatter"""
     # 添加一个可控的 logger（模拟 gunicorn.error）
+    # NullHandler keeps "Logging handler established" off stderr
     test_logger = logging.getLogger("test.logger")
-    stream_handler = logging.StreamHandler()
-    test_logger.addHandler(stream_handler)
+    null_handler = logging.NullHandler()
+    test_logger.addHandler(null_handler)
     test_logger.setLevel(logging.INFO)
 
     # 初始化日志
     log_handlers.init_logging(app, "test.logger")
 
     # 断言 app.logger 继承了 handler，并且 formatter 被设置
-    for handler in app.logger.handlers:
-        assert isinstance(handler.formatter, logging.Formatter)
-        formatted = handler.formatter.format(
-            logging.LogRecord(
-                name="test",
-                level=logging.INFO,
-                pathname=__file__,
-                lineno=10,
-                msg="message",
-                args=(),
-                exc_info=None,
-            )
-        )
-        assert "message" in formatted
+    assert null_handler in app_logger.handlers
+    assert app_logger.level == logging.INFO
+    assert all(isinstance(h.formatter, logging.Formatter) for h in app_logger.handlers)
+    assert "message" in null_handler.formatter.format(RECORD)